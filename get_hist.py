@@ -10,11 +10,13 @@ Features:
 - Auto-generated descriptive filenames
 - Input validation and warnings for API limitations
 - Support for stocks, forex, and futures
+- Concurrent multi-symbol downloads with IBKR pacing-aware scheduling
 
 Usage Examples:
     python get_hist.py -s SPY -t "1 min" -d "30 D"
     python get_hist.py -s AAPL -t "5 mins" -d "1 Y" 
     python get_hist.py -s EURUSD -t "1 hour" -d "6 M"
+    python get_hist.py -s SPY QQQ IWM -t "5 mins" -d "30 D"
     python get_hist.py --help
 
 Author: Enhanced version of original IBKR script
@@ -22,11 +24,30 @@ Author: Enhanced version of original IBKR script
 
 import logging
 import argparse
+import asyncio
+import atexit
+import csv
+import importlib.util
 import sys
+import io
+import itertools
+import multiprocessing
 import os
-from datetime import datetime
-import pytz
-from ib_async import IB, Stock, Forex, Future, util
+import queue
+import stat
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import math
+import re
+from ib_async import IB, Stock, Forex, Future, RequestError, util
+import numpy as np
 import pandas as pd
 
 # --- Configuration: Modify these variables ---
@@ -62,18 +83,148 @@ IB_PORT = 4001               # Default for TWS Paper: 7497, TWS Live: 7496
                                # Gateway Paper: 4002, Gateway Live: 4001
 CLIENT_ID = 77                # Choose a unique client ID for this script connection
 
+# Historical data pacing
+MAX_CONCURRENT_REQUESTS = 45  # IBKR allows at most 50 simultaneous open historical data requests
+PACING_REQUESTS = 6           # Token bucket: at most PACING_REQUESTS requests...
+PACING_PERIOD = 2.0           # ...every PACING_PERIOD seconds
+PACING_MAX_RETRIES = 5        # Retries after a pacing violation (error 162)
+PACING_BACKOFF_SECONDS = 2.0  # Initial backoff delay, doubled on every retry
+SMALL_BAR_PACING_REQUESTS = 60     # Bars of 30 secs or less: at most SMALL_BAR_PACING_REQUESTS requests...
+SMALL_BAR_PACING_PERIOD = 600.0    # ...in any SMALL_BAR_PACING_PERIOD seconds
+REQUEST_TIMEOUT = 60          # Seconds to wait for a single historical data request
+
 # --- End of Configuration ---
 
 # Supported IBKR bar sizes (timeframes)
-VALID_BAR_SIZES = [
+VALID_BAR_SIZES = (
     '1 secs', '5 secs', '10 secs', '15 secs', '30 secs',
     '1 min', '2 mins', '3 mins', '5 mins', '10 mins', '15 mins', '20 mins', '30 mins',
     '1 hour', '2 hours', '3 hours', '4 hours', '8 hours',
     '1 day', '1 week', '1 month'
-]
+)
+
+# Bar sizes of 30 seconds or less (subject to IBKR's stricter pacing and 6 month history limit)
+SMALL_BARS = frozenset({'1 secs', '5 secs', '10 secs', '15 secs', '30 secs'})
+
+# Intraday bar sizes (output with a timestamp rather than a date)
+INTRADAY_BARS = frozenset({
+    '1 secs', '5 secs', '10 secs', '15 secs', '30 secs',
+    '1 min', '2 mins', '3 mins', '5 mins', '10 mins', '15 mins', '20 mins', '30 mins',
+    '1 hour', '2 hours', '3 hours', '4 hours', '8 hours'
+})
+
+# Accepted --from/--to formats: YYYY-MM-DD, YYYY-MM-DD HH:MM, YYYY-MM-DD HH:MM:SS
+DATE_ARGUMENT_PATTERN = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{1,2})(?::(\d{1,2}))?)?$')
+
+
+class Mode(IntEnum):
+    """How the requested time range was specified on the command line."""
+    DATE_RANGE = 0
+    SINGLE_DAY = 1
+    DURATION_WITH_END = 2
+    DURATION_ONLY = 3
+
+
+# Result of date argument processing, used for display (unused fields are None)
+DateInfo = namedtuple('DateInfo', 'mode start_date end_date duration')
+
+# Unit abbreviations used in generated filenames ('mins' must be tried before 'min')
+TIMEFRAME_ABBREVIATIONS = {
+    ' ': '', 'secs': 's', 'mins': 'm', 'min': 'm', 'hour': 'h', 'day': 'd', 'week': 'w', 'month': 'M'
+}
+TIMEFRAME_CLEAN_PATTERN = re.compile(r' |secs|mins|min|hour|day|week|month')
+
+# '.0' at the end of a CSV cell, written by %r for whole-number floats (pyarrow writes '1', not '1.0')
+WHOLE_FLOAT_SUFFIX_PATTERN = re.compile(rb'\.0(?=[,\n])')
+
+# Column layout used to build DataFrames directly from received bars
+BAR_DTYPE = np.dtype([
+    ('date', 'datetime64[s]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+])
+
+# Output column names for the BAR_DTYPE price and volume columns
+OUTPUT_COLUMN_NAMES = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+# Supported output file formats (parquet and feather require pyarrow)
+OUTPUT_FORMATS = ('csv', 'parquet', 'feather')
+
+# Supported price precisions for the Open/High/Low/Close columns
+PRICE_PRECISIONS = ('f32', 'f64')
+
+# Default rows per block when streaming CSV output (--chunksize)
+CSV_CHUNK_SIZE = 65536
+
+# Write buffer size for --streaming-csv output
+STREAMING_CSV_BUFFER_SIZE = 1 << 20
+
+# Write buffer size for CSV output built from a DataFrame
+OUTPUT_BUFFER_SIZE = 8 << 20
+
+# Blocks that may wait for the background writer thread with --async-io
+ASYNC_WRITE_QUEUE_SIZE = 4
+
+# Worker threads that format and write output files while the event loop keeps receiving bars
+SAVE_WORKERS = 2
+SAVE_EXECUTOR = ThreadPoolExecutor(max_workers=SAVE_WORKERS, thread_name_prefix='save')
+
+# Frames with at least this many rows have their CSV blocks formatted in worker processes
+# when pyarrow is unavailable (smaller frames do not cover the process startup cost)
+PARALLEL_FORMAT_MIN_ROWS = 2_000_000
+PARALLEL_FORMAT_WORKERS = min(6, os.cpu_count() or 1)
+
+# Maximum span covered by a single historical data request for each bar size.
+# Longer requests are split into windows of this size and fetched concurrently.
+MAX_REQUEST_SPAN = {
+    '1 secs': timedelta(minutes=30),
+    '5 secs': timedelta(hours=1),
+    '10 secs': timedelta(hours=4),
+    '15 secs': timedelta(hours=4),
+    '30 secs': timedelta(hours=8),
+    '1 min': timedelta(days=30),
+    '2 mins': timedelta(days=30),
+    '3 mins': timedelta(days=30),
+    '5 mins': timedelta(days=30),
+    '10 mins': timedelta(days=30),
+    '15 mins': timedelta(days=30),
+    '20 mins': timedelta(days=30),
+    '30 mins': timedelta(days=30),
+    '1 hour': timedelta(days=365),
+    '2 hours': timedelta(days=365),
+    '3 hours': timedelta(days=365),
+    '4 hours': timedelta(days=365),
+    '8 hours': timedelta(days=365),
+    '1 day': timedelta(days=365),
+    '1 week': timedelta(days=365),
+    '1 month': timedelta(days=365),
+}
+
+# System timezone, resolved once at import for --timezone local
+LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+# Progress, warning and error messages go through logging; main() shows warnings and
+# errors by default and progress messages with --verbose. Importers configure logging
+# themselves. The startup banner and the saved-to line are always printed.
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# ib_async log messages for IBKR errors this script reports (or deliberately ignores) itself:
+# error 162 (pacing violations, windows without data, other history failures), error 200 and
+# "Unknown contract" (unqualified symbols), and history request timeouts
+HANDLED_IB_MESSAGE_PATTERN = re.compile(r'Error (162|200), reqId|Unknown contract: |reqHistoricalData: Timeout')
+
+
+class HandledIBMessageFilter(logging.Filter):
+    """Drop ib_async log records that would duplicate this script's own messages."""
+    
+    def filter(self, record):
+        return not HANDLED_IB_MESSAGE_PATTERN.match(record.getMessage())
 
 # Optional: Enable more detailed logging from ib_async
-# logging.basicConfig(level=logging.INFO)
 # logging.getLogger('ib_async').setLevel(logging.INFO)
 
 
@@ -87,6 +238,7 @@ Examples:
   %(prog)s -s AAPL -t "5 mins" -d "1 Y"          # 1 year of 5-minute AAPL data  
   %(prog)s -s EURUSD -t "1 hour" -d "6 M"        # 6 months of 1-hour EURUSD data
   %(prog)s -s ES -t "1 day" -d "2 Y"             # 2 years of daily ES futures data
+  %(prog)s -s SPY QQQ IWM -t "5 mins" -d "30 D"  # Several symbols downloaded concurrently
   
   # Date range examples:
   %(prog)s --from 2024-01-15 -t "1 min"          # Single day of 1-minute data
@@ -106,8 +258,9 @@ Note: Bars 30 seconds or smaller older than 6 months are not available from IBKR
     )
     
     parser.add_argument('-s', '--symbol', 
-                        default=TARGET_SYMBOL,
-                        help=f'Symbol to download (default: {TARGET_SYMBOL})')
+                        nargs='+',
+                        default=[TARGET_SYMBOL],
+                        help=f'Symbol(s) to download, fetched concurrently (default: {TARGET_SYMBOL})')
     
     parser.add_argument('-t', '--timeframe', 
                         default='1 day',
@@ -121,6 +274,40 @@ Note: Bars 30 seconds or smaller older than 6 months are not available from IBKR
     parser.add_argument('-o', '--output',
                         help='Output filename (auto-generated if not specified)')
     
+    parser.add_argument('--format',
+                        dest='output_format',
+                        choices=OUTPUT_FORMATS,
+                        help='Output file format (default: taken from the -o suffix, otherwise parquet if pyarrow is installed, else csv). '
+                             'parquet/feather use zstd compression and require pyarrow')
+    
+    parser.add_argument('--cache-dir',
+                        dest='cache_dir',
+                        help='Cache intraday bars per day in this directory and only download days not cached yet (requires pyarrow)')
+    
+    parser.add_argument('--precision',
+                        default='f32',
+                        choices=PRICE_PRECISIONS,
+                        help='Price column precision (default: f32). f32 stores ~7 significant digits, f64 keeps prices exactly as received')
+    
+    parser.add_argument('--streaming-csv',
+                        dest='streaming_csv',
+                        action='store_true',
+                        help='Write CSV rows straight from the received bars without building a DataFrame (lowest memory use)')
+    
+    parser.add_argument('--chunksize',
+                        type=int,
+                        default=CSV_CHUNK_SIZE,
+                        help=f'Rows written per block for CSV output (default: {CSV_CHUNK_SIZE}). Lower values reduce peak memory')
+    
+    parser.add_argument('--async-io',
+                        dest='async_io',
+                        action='store_true',
+                        help='Write CSV blocks from a background thread while the next block is formatted')
+    
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        help='Show progress messages (by default only the banner, saved files, warnings, errors and prompts are shown)')
+    
     parser.add_argument('--overwrite', 
                         action='store_true',
                         help='Overwrite existing files without prompting')
@@ -142,7 +329,18 @@ Note: Bars 30 seconds or smaller older than 6 months are not available from IBKR
                         action='store_true',
                         help='Include extended trading hours (pre-market and after-hours data)')
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    
+    if args.output and len(args.symbol) > 1:
+        parser.error('-o/--output can only be used when downloading a single symbol')
+    
+    if args.chunksize < 1:
+        parser.error('--chunksize must be a positive number of rows')
+    
+    if args.streaming_csv and resolve_output_format(args.output_format, args.output, streaming_csv=True) != 'csv':
+        parser.error('--streaming-csv can only be used with CSV output (--format csv or a .csv output file)')
+    
+    return args
 
 
 def validate_timeframe_duration(timeframe, duration):
@@ -152,13 +350,12 @@ def validate_timeframe_duration(timeframe, duration):
     warnings = []
     
     # Check for small bar sizes with long durations
-    small_bars = ['1 secs', '5 secs', '10 secs', '15 secs', '30 secs']
-    if timeframe in small_bars:
+    if timeframe in SMALL_BARS:
         warnings.append(f"WARNING: Timeframe '{timeframe}' with duration '{duration}' may hit IBKR pacing limits")
         warnings.append("WARNING: Bars 30 seconds or smaller older than 6 months are not available from IBKR")
     
     # Check for very long durations with small timeframes
-    if timeframe in small_bars and any(x in duration.upper() for x in ['Y', 'YEAR']):
+    if timeframe in SMALL_BARS and any(x in duration.upper() for x in ['Y', 'YEAR']):
         warnings.append("WARNING: Small timeframes with yearly durations may result in very large datasets")
     
     return warnings
@@ -175,30 +372,22 @@ def process_date_arguments(start_date_str, end_date_str, default_duration, inclu
         include_extended_hours: If True, use extended hours times
         
     Returns:
-        tuple: (end_datetime_str, duration_str, processed_info)
+        tuple: (end_datetime_str, duration_str, date_info)
             end_datetime_str: String for IBKR endDateTime parameter
             duration_str: String for IBKR durationStr parameter
-            processed_info: Dict with processing information for display
+            date_info: DateInfo with processing information for display
     """
-    from datetime import datetime, timedelta, time
-    import pytz
-    
     def parse_date_string(date_str):
         """Parse date string in various formats"""
         if not date_str:
             return None
-            
-        formats = [
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d %H:%M',
-            '%Y-%m-%d',
-        ]
         
-        for fmt in formats:
+        match = DATE_ARGUMENT_PATTERN.match(date_str.strip())
+        if match:
             try:
-                return datetime.strptime(date_str, fmt)
+                return datetime(*(int(part) if part else 0 for part in match.groups()))
             except ValueError:
-                continue
+                pass  # Out of range component, e.g. month 13
         
         raise ValueError(f"Invalid date format: {date_str}. Use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS")
     
@@ -224,8 +413,6 @@ def process_date_arguments(start_date_str, end_date_str, default_duration, inclu
     if start_date and end_date and start_date > end_date:
         raise ValueError("Start date cannot be after end date")
     
-    processed_info = {}
-    
     if start_date and end_date:
         # Case 1: Both dates provided
         duration_days = (end_date - start_date).days + 1
@@ -240,7 +427,7 @@ def process_date_arguments(start_date_str, end_date_str, default_duration, inclu
         has_time = end_date.time() != datetime.min.time()
         end_datetime_str = format_ibkr_datetime(end_date, has_time)
         
-        processed_info = { 'mode': 'date_range', 'start_date': start_date_str, 'end_date': end_date_str, 'calculated_duration': duration_str }
+        date_info = DateInfo(Mode.DATE_RANGE, start_date_str, end_date_str, duration_str)
     
     elif start_date and not end_date:
         # Case 2: Only start date provided
@@ -259,7 +446,7 @@ def process_date_arguments(start_date_str, end_date_str, default_duration, inclu
             
         end_datetime_str = format_ibkr_datetime(end_datetime, has_time)
         
-        processed_info = { 'mode': 'single_day', 'target_date': start_date_str, 'duration': duration_str }
+        date_info = DateInfo(Mode.SINGLE_DAY, start_date_str, None, duration_str)
     
     elif not start_date and end_date:
         # Case 3: Only end date provided
@@ -267,7 +454,7 @@ def process_date_arguments(start_date_str, end_date_str, default_duration, inclu
         has_time = end_date.time() != datetime.min.time()
         end_datetime_str = format_ibkr_datetime(end_date, has_time)
         
-        processed_info = { 'mode': 'duration_with_end', 'end_date': end_date_str, 'duration': duration_str }
+        date_info = DateInfo(Mode.DURATION_WITH_END, None, end_date_str, duration_str)
     
     else:
         # Case 4: Neither date provided
@@ -286,9 +473,122 @@ def process_date_arguments(start_date_str, end_date_str, default_duration, inclu
             today = datetime.now()
             end_datetime_str = format_ibkr_datetime(today, False)
         
-        processed_info = { 'mode': 'duration_only', 'duration': duration_str }
+        date_info = DateInfo(Mode.DURATION_ONLY, None, None, duration_str)
     
-    return end_datetime_str, duration_str, processed_info
+    return end_datetime_str, duration_str, date_info
+
+
+def duration_to_timedelta(duration_str):
+    """
+    Convert an IBKR duration string (e.g., '30 D', '6 M', '1 Y') to an approximate timedelta.
+    
+    Months are counted as 30 days and years as 365 days.
+    """
+    unit_days = {'D': 1, 'W': 7, 'M': 30, 'Y': 365}
+    try:
+        amount_str, unit = duration_str.split()
+        amount = int(amount_str)
+    except ValueError:
+        raise ValueError(f"Invalid duration: {duration_str}. Use formats like '3600 S', '30 D', '2 W', '6 M', '1 Y'")
+    
+    unit = unit.upper()
+    if unit == 'S':
+        return timedelta(seconds=amount)
+    if unit not in unit_days:
+        raise ValueError(f"Invalid duration unit in '{duration_str}'. Valid units: S, D, W, M, Y")
+    return timedelta(days=amount * unit_days[unit])
+
+
+def split_request_window(start, end, bar_size):
+    """
+    Split the [start, end] range into windows no longer than the per-request
+    maximum for the bar size.
+    
+    Args:
+        start: Start datetime of the requested range
+        end: End datetime of the requested range (naive TWS local time, or UTC-aware)
+        bar_size: Bar size string (e.g., '1 min')
+        
+    Returns:
+        list: (end_datetime_str, duration_str) tuples in chronological order
+    """
+    max_span = MAX_REQUEST_SPAN[bar_size]
+    # Timezone-aware ranges are sent to IBKR explicitly in UTC
+    end_format = '%Y%m%d %H:%M:%S UTC' if end.tzinfo is not None else '%Y%m%d %H:%M:%S'
+    windows = []
+    window_end = end
+    
+    while window_end > start:
+        span = min(max_span, window_end - start)
+        if span < timedelta(days=1):
+            duration_str = f"{math.ceil(span.total_seconds())} S"
+        else:
+            duration_str = f"{math.ceil(span.total_seconds() / 86400)} D"
+        windows.append((window_end.strftime(end_format), duration_str))
+        window_end -= span
+    
+    windows.reverse()
+    return windows
+
+
+def get_request_range(end_datetime_str, hist_duration):
+    """
+    Get the approximate (start, end) datetimes covered by a history request.
+    
+    Returns:
+        tuple: (start, end) as naive datetimes in TWS local time
+    """
+    end = datetime.strptime(end_datetime_str, '%Y%m%d %H:%M:%S') if end_datetime_str else datetime.now()
+    return end - duration_to_timedelta(hist_duration), end
+
+
+def plan_request_windows(end_datetime_str, hist_duration, bar_size):
+    """
+    Determine the (endDateTime, duration) requests needed to cover a history request.
+    
+    Returns the original request unchanged when it fits in a single request,
+    otherwise the result of split_request_window.
+    """
+    start, end = get_request_range(end_datetime_str, hist_duration)
+    
+    if end - start <= MAX_REQUEST_SPAN[bar_size]:
+        return [(end_datetime_str, hist_duration)]
+    
+    return split_request_window(start, end, bar_size)
+
+
+def raise_for_failed_windows(windows):
+    """Raise LookupError if any request window failed (is None)."""
+    failed = sum(window is None for window in windows)
+    if failed:
+        raise LookupError(f"{failed} of {len(windows)} historical data request(s) failed; not saving incomplete data.")
+
+
+def merge_bar_windows(windows):
+    """
+    Merge bar lists from chronologically ordered request windows into one list,
+    dropping bars repeated where adjacent windows overlap.
+    
+    Raises:
+        LookupError: If any window failed (is None), since the merged bars would have a gap
+    """
+    raise_for_failed_windows(windows)
+    
+    merged = []
+    for bars in windows:
+        start = 0
+        if merged:
+            last_date = merged[-1].date
+            while start < len(bars) and bars[start].date <= last_date:
+                start += 1
+        merged.extend(bars[start:])
+    return merged
+
+
+@lru_cache(maxsize=8)
+def get_zoneinfo(name):
+    """Return a cached ZoneInfo object for an IANA timezone name (e.g., 'America/New_York')."""
+    return ZoneInfo(name)
 
 
 def get_target_timezone(timezone_choice, symbol):
@@ -300,23 +600,39 @@ def get_target_timezone(timezone_choice, symbol):
         symbol: The trading symbol (used to determine market timezone)
         
     Returns:
-        pytz timezone object
+        tzinfo object
     """
     if timezone_choice == 'UTC':
-        return pytz.UTC
+        return get_zoneinfo('UTC')
     elif timezone_choice == 'local':
-        return pytz.timezone('UTC').localize(datetime.now()).astimezone().tzinfo
+        return LOCAL_TZ
     elif timezone_choice == 'market':
         # For US symbols, use Eastern Time (NYSE/NASDAQ)
         # Could be enhanced to support international markets
         symbol_upper = symbol.upper()
         if symbol_upper in ['SPY', 'QQQ', 'IWM'] or len(symbol_upper) <= 5:  # Assume US symbols
-            return pytz.timezone('US/Eastern')
+            return get_zoneinfo('America/New_York')
         else:
             # Default to US/Eastern for now, could be expanded for forex/international
-            return pytz.timezone('US/Eastern')
+            return get_zoneinfo('America/New_York')
     else:
-        return pytz.UTC
+        return get_zoneinfo('UTC')
+
+
+def get_timezone_name(timezone_choice, target_timezone, now=None):
+    """
+    Get the timezone abbreviation used in the intraday date column header (e.g., 'EST', 'UTC').
+    
+    Args:
+        timezone_choice: 'UTC', 'market', or 'local'
+        target_timezone: tzinfo object returned by get_target_timezone
+        now: Timezone-aware current time captured by the caller (uses the current time if None)
+    """
+    if timezone_choice == 'UTC':
+        return 'UTC'
+    if now is None:
+        now = datetime.now(tz=get_zoneinfo('UTC'))
+    return now.astimezone(target_timezone).tzname()
 
 
 def convert_datetime_column(datetime_series, target_timezone):
@@ -325,7 +641,7 @@ def convert_datetime_column(datetime_series, target_timezone):
     
     Args:
         datetime_series: Pandas datetime series (should be UTC timezone-aware)
-        target_timezone: Target pytz timezone object
+        target_timezone: Target tzinfo object
         
     Returns:
         Converted datetime series
@@ -334,11 +650,8 @@ def convert_datetime_column(datetime_series, target_timezone):
     if datetime_series.dt.tz is None:
         # If somehow not timezone-aware, assume UTC
         datetime_series = datetime_series.dt.tz_localize('UTC')
-    elif datetime_series.dt.tz != pytz.UTC:
-        # Convert to UTC first if it's in a different timezone
-        datetime_series = datetime_series.dt.tz_convert('UTC')
     
-    # Convert to target timezone
+    # tz_convert works from any source timezone, so no UTC normalization is needed first
     return datetime_series.dt.tz_convert(target_timezone)
 
 
@@ -348,21 +661,34 @@ def format_timezone_aware_datetime(datetime_series, target_timezone, is_intraday
     
     Args:
         datetime_series: Pandas datetime series
-        target_timezone: Target pytz timezone object
+        target_timezone: Target tzinfo object
         is_intraday: Boolean indicating if this is intraday data
         
     Returns:
         Formatted datetime strings
     """
-    # Convert to target timezone
-    converted_series = convert_datetime_column(datetime_series, target_timezone)
+    if not is_intraday and datetime_series.dt.tz is None:
+        # Daily+ bars carry naive calendar dates; converting them as UTC midnight
+        # would shift every date one day back in zones west of UTC
+        local_values = datetime_series.values
+    else:
+        # Convert to target timezone
+        converted_series = convert_datetime_column(datetime_series, target_timezone)
+        
+        # Keep the local wall-clock time
+        local_values = converted_series.dt.tz_localize(None).values
+    
+    # Format the whole column in one vectorized pass with numpy instead of a per-row strftime
     
     if is_intraday:
         # For intraday, include time but not timezone in each row (timezone is in column header)
-        return converted_series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        formatted = np.datetime_as_string(local_values.astype('datetime64[s]'), unit='s')
+        formatted = np.char.replace(formatted, 'T', ' ')
     else:
         # For daily+, just show date (timezone less relevant)
-        return converted_series.dt.strftime('%Y-%m-%d')
+        formatted = np.datetime_as_string(local_values.astype('datetime64[D]'), unit='D')
+    
+    return pd.Series(formatted, index=datetime_series.index)
 
 
 def is_intraday_timeframe(timeframe):
@@ -375,21 +701,52 @@ def is_intraday_timeframe(timeframe):
     Returns:
         bool: True if intraday timeframe, False if daily or longer
     """
-    intraday_timeframes = [
-        '1 secs', '5 secs', '10 secs', '15 secs', '30 secs',
-        '1 min', '2 mins', '3 mins', '5 mins', '10 mins', '15 mins', '20 mins', '30 mins',
-        '1 hour', '2 hours', '3 hours', '4 hours', '8 hours'
-    ]
-    return timeframe in intraday_timeframes
+    return timeframe in INTRADAY_BARS
 
 
-def generate_filename(symbol, security_type, duration, timeframe, future_contract_month=None, include_extended_hours=False):
+def resolve_output_format(output_format, output_filename=None, streaming_csv=False):
+    """
+    Determine the output format when none was requested explicitly.
+    
+    An explicit format wins; otherwise the suffix of the output filename decides
+    (callers reject a non-CSV result when streaming CSV output was requested).
+    Generated filenames use CSV for streaming output and otherwise default to
+    Parquet, which is much faster to write and smaller than CSV, when pyarrow is
+    installed and to CSV otherwise.
+    
+    Args:
+        output_format: Requested format, or None
+        output_filename: Output filename given by the user, or None
+        streaming_csv: If True, streaming CSV output was requested
+        
+    Returns:
+        str: One of OUTPUT_FORMATS
+    """
+    if output_format is not None:
+        return output_format
+    
+    if output_filename is not None:
+        suffix = os.path.splitext(output_filename)[1].lower().lstrip('.')
+        # Unknown suffixes keep the historical CSV behaviour
+        return suffix if suffix in OUTPUT_FORMATS else 'csv'
+    
+    if streaming_csv:
+        return 'csv'
+    
+    # Only check that pyarrow is installed; it is imported when the file is written
+    if importlib.util.find_spec('pyarrow') is not None:
+        return 'parquet'
+    
+    logger.info("Tip: Install pyarrow (pip install pyarrow) for faster, smaller Parquet output. Writing CSV.")
+    return 'csv'
+
+
+def generate_filename(symbol, security_type, duration, timeframe, future_contract_month=None, include_extended_hours=False, output_format='csv'):
     """
     Generate a descriptive filename based on the parameters.
     """
-    # Clean up timeframe for filename (replace spaces with nothing, handle special chars)
-    timeframe_clean = timeframe.replace(' ', '').replace('secs', 's').replace('mins', 'm').replace('min', 'm')
-    timeframe_clean = timeframe_clean.replace('hour', 'h').replace('day', 'd').replace('week', 'w').replace('month', 'M')
+    # Clean up timeframe for filename (drop spaces and abbreviate units) in a single pass
+    timeframe_clean = TIMEFRAME_CLEAN_PATTERN.sub(lambda match: TIMEFRAME_ABBREVIATIONS[match.group()], timeframe)
     
     # Clean up duration for filename
     duration_clean = duration.replace(' ', '')
@@ -412,20 +769,56 @@ def generate_filename(symbol, security_type, duration, timeframe, future_contrac
     
     filename_parts.append("OHLCV")
     
-    return "_".join(filename_parts) + ".csv"
+    return "_".join(filename_parts) + "." + output_format
+
+
+@lru_cache(maxsize=1024)
+def stat_cached(path):
+    """
+    Stat a path, memoized across calls.
+    
+    The cache is cleared whenever this process creates or writes an output file,
+    so repeated downloads in one process do not stat the same paths again.
+    
+    Returns:
+        os.stat_result, or None if the path does not exist
+    """
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def reserve_filename(filename):
+    """
+    Atomically create an empty file if (and only if) it does not exist yet.
+    
+    Returns:
+        bool: True if the file was created, False if it already existed
+    """
+    try:
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    stat_cached.cache_clear()
+    return True
 
 
 def generate_unique_filename(base_filename):
     """
     Generate a unique filename by appending timestamp if the base filename already exists.
     
+    The returned name is reserved by creating it as an empty file with O_EXCL, so
+    concurrent downloads can never be handed the same filename.
+    
     Args:
         base_filename: Original filename (e.g., 'SPY_STK_1D_1m_OHLCV.csv')
         
     Returns:
         str: Unique filename with timestamp if needed (e.g., 'SPY_STK_1D_1m_OHLCV_20250904_163045.csv')
     """
-    if not os.path.exists(base_filename):
+    if reserve_filename(base_filename):
         return base_filename
     
     # Split filename and extension
@@ -437,9 +830,9 @@ def generate_unique_filename(base_filename):
     # Create new filename with timestamp
     unique_filename = f"{name_part}_{timestamp}{ext}"
     
-    # If somehow this filename also exists, keep adding seconds until unique
+    # If somehow this filename also exists, keep adding a counter until unique
     counter = 1
-    while os.path.exists(unique_filename):
+    while not reserve_filename(unique_filename):
         unique_filename = f"{name_part}_{timestamp}_{counter:02d}{ext}"
         counter += 1
     
@@ -459,18 +852,18 @@ def handle_file_conflict(filename, overwrite_flag=False):
             final_filename: The filename to use (original or renamed)
             should_proceed: Boolean indicating if operation should continue
     """
-    if not os.path.exists(filename):
+    file_stat = stat_cached(filename)
+    if file_stat is None:
         return filename, True
     
     # If overwrite flag is set, proceed with original filename
     if overwrite_flag:
-        print(f"Overwriting existing file: {filename}")
+        logger.info("Overwriting existing file: %s", filename)
         return filename, True
     
     # Get file creation time for display
     try:
-        creation_time = os.path.getctime(filename)
-        formatted_time = datetime.fromtimestamp(creation_time).strftime('%Y-%m-%d %H:%M:%S')
+        formatted_time = datetime.fromtimestamp(file_stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
     except (OSError, ValueError):
         formatted_time = "unknown"
     
@@ -509,7 +902,7 @@ def create_contract(symbol=None, security_type=None):
     target_symbol = symbol if symbol is not None else TARGET_SYMBOL
     sec_type = security_type if security_type is not None else SECURITY_TYPE
     
-    print(f"Creating contract for {target_symbol} ({sec_type})...")
+    logger.info("Creating contract for %s (%s)...", target_symbol, sec_type)
     
     if sec_type == "STK":
         return Stock(target_symbol, STOCK_EXCHANGE, STOCK_CURRENCY)
@@ -529,235 +922,1318 @@ def create_contract(symbol=None, security_type=None):
         raise ValueError(f"Unsupported SECURITY_TYPE: {sec_type}. Please use 'STK', 'CASH', or 'FUT'.")
 
 
-def fetch_and_save_historical_data(symbol=None, timeframe=None, duration=None, output_filename=None, overwrite=False, timezone_choice='market', start_date=None, end_date=None, include_extended_hours=False):
+class TokenBucket:
     """
-    Connects to IBKR, fetches historical OHLC data for the specified symbol,
-    timeframe, and duration, and stores it in a CSV file.
+    Asyncio token-bucket rate limiter used to stay within IBKR pacing limits.
+
+    Allows bursts of up to `rate` requests and refills at `rate` tokens every
+    `per` seconds.
+    """
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+
+class SlidingWindowLimiter:
+    """
+    Asyncio rate limiter allowing at most `limit` requests in any `window` seconds.
+
+    Unlike TokenBucket, which refills continuously, this enforces IBKR's hard
+    limit for small bars (60 requests in any 10-minute period).
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until another request fits in the window and record it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.window:
+                    self._sent.popleft()
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                await asyncio.sleep(self._sent[0] + self.window - now)
+
+
+class IBConnectionPool:
+    """
+    Process-wide IBKR connections keyed by client ID.
+    
+    Connections are opened lazily on first use, reused by later downloads in the
+    same process and event loop, and closed when the interpreter exits.
+    """
+    
+    _connections = {}
+    _loops = {}
+    
+    @classmethod
+    async def get(cls, client_id=CLIENT_ID):
+        """Return a connected IB instance for client_id, connecting if needed."""
+        loop = asyncio.get_running_loop()
+        ib = cls._connections.get(client_id)
+        if ib is not None and ib.isConnected() and cls._loops.get(client_id) is loop:
+            return ib
+        
+        if ib is not None and ib.isConnected():
+            # Connection belongs to a different event loop and cannot be reused
+            ib.disconnect()
+        
+        ib = IB()
+        
+        logger.info("Attempting to connect to IBKR at %s:%s with Client ID %s...", IB_HOST, IB_PORT, client_id)
+        await ib.connectAsync(IB_HOST, IB_PORT, clientId=client_id, timeout=15) # Connection timeout
+        logger.info("Successfully connected to IBKR.")
+        
+        cls._connections[client_id] = ib
+        cls._loops[client_id] = loop
+        return ib
+    
+    @classmethod
+    def close_all(cls):
+        """Disconnect all pooled connections."""
+        for ib in cls._connections.values():
+            if ib.isConnected():
+                logger.info("Disconnecting from IBKR...")
+                ib.disconnect()
+                logger.info("Disconnected.")
+        cls._connections.clear()
+        cls._loops.clear()
+
+
+atexit.register(IBConnectionPool.close_all)
+
+
+class BarCache:
+    """
+    On-disk cache of intraday bars with one Parquet file per UTC day, laid out as
+    {cache_dir}/{conId}/{bar size}_{WHAT_TO_SHOW}_{RTH|ETH}/{YYYY-MM-DD}.parquet
+    
+    Only days that lie completely inside a downloaded range are stored, so cached
+    days are never partial. Days without bars (weekends, holidays) are stored as
+    empty files so they are not requested again.
+    """
+    
+    def __init__(self, cache_dir, con_id, bar_size, use_rth):
+        session = 'RTH' if use_rth else 'ETH'
+        self.directory = os.path.join(cache_dir, str(con_id), f"{bar_size.replace(' ', '')}_{WHAT_TO_SHOW}_{session}")
+    
+    @staticmethod
+    def complete_days(start, end):
+        """List the UTC days that lie entirely within [start, end] and are already over."""
+        utc = get_zoneinfo('UTC')
+        end = min(end, datetime.now(tz=utc))
+        first = start.astimezone(utc).date()
+        day_start = datetime(first.year, first.month, first.day, tzinfo=utc)
+        if day_start < start:
+            day_start += timedelta(days=1)
+        
+        days = []
+        while day_start + timedelta(days=1) <= end:
+            days.append(day_start.date())
+            day_start += timedelta(days=1)
+        return days
+    
+    def day_path(self, day):
+        return os.path.join(self.directory, f"{day.isoformat()}.parquet")
+    
+    def cached_days(self):
+        """Return the set of days currently stored in the cache."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return set()
+        
+        days = set()
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext != '.parquet':
+                continue
+            try:
+                days.add(datetime.strptime(stem, '%Y-%m-%d').date())
+            except ValueError:
+                continue
+        return days
+    
+    def plan(self, start, end):
+        """
+        Split a UTC-aware [start, end] range into cached days and ranges still to download.
+        
+        Returns:
+            tuple: (cached_days, missing_spans) where missing_spans is a list of (start, end) tuples
+        """
+        cached = self.cached_days()
+        hits = []
+        missing_spans = []
+        cursor = start
+        
+        for day in self.complete_days(start, end):
+            if day not in cached:
+                continue
+            day_start = datetime(day.year, day.month, day.day, tzinfo=start.tzinfo)
+            if cursor < day_start:
+                missing_spans.append((cursor, day_start))
+            cursor = day_start + timedelta(days=1)
+            hits.append(day)
+        
+        if cursor < end:
+            missing_spans.append((cursor, end))
+        
+        return hits, missing_spans
+    
+    def store(self, bars_df, spans):
+        """Write every complete day inside the downloaded spans to the cache."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        if bars_df is None:
+            bars_df = pd.DataFrame(np.empty(0, dtype=BAR_DTYPE))
+            bars_df['date'] = bars_df['date'].dt.tz_localize('UTC')
+        
+        bar_days = bars_df['date'].dt.tz_convert('UTC').dt.date
+        frames_by_day = {day: frame for day, frame in bars_df.groupby(bar_days)}
+        
+        os.makedirs(self.directory, exist_ok=True)
+        for span_start, span_end in spans:
+            for day in self.complete_days(span_start, span_end):
+                day_df = frames_by_day.get(day, bars_df.iloc[0:0])
+                path = self.day_path(day)
+                # Write to a temporary file first so concurrent readers never see a partial day
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                pq.write_table(pa.Table.from_pandas(day_df, preserve_index=False), temp_path)
+                os.replace(temp_path, path)
+    
+    def load(self, days):
+        """Read the given cached days as one DataFrame (None if no days are given)."""
+        if not days:
+            return None
+        
+        import pyarrow.dataset as ds
+        
+        dataset = ds.dataset([self.day_path(day) for day in sorted(days)], format='parquet')
+        df = dataset.to_table().to_pandas()
+        # Parquet round-trips dates as datetime64[ms] with a ZoneInfo tz; match bars_to_frame
+        # (seconds, UTC) so concatenating with freshly downloaded bars keeps a datetime64 column
+        df['date'] = df['date'].dt.tz_convert('UTC').astype('datetime64[s, UTC]')
+        return df
+
+
+def is_pacing_violation(error):
+    """Return True if an IBKR RequestError is a historical data pacing violation (error 162)."""
+    return error.code == 162 and 'pacing' in error.message.lower()
+
+
+def is_no_data(error):
+    """Return True if an IBKR RequestError only reports that a query returned no data (error 162)."""
+    return error.code == 162 and 'no data' in error.message.lower()
+
+
+async def request_historical_bars(ib, contract, end_datetime_str, hist_duration, bar_size, use_rth, semaphore, bucket,
+                                  window_limiter=None):
+    """
+    Request historical bars for one contract, honouring the shared concurrency
+    limit, pacing bucket and (for small bars) window limiter. Pacing violations
+    are retried with exponential backoff.
+
+    Returns:
+        list: Bars received from IBKR (empty if IBKR has no data for the window),
+        or None if the request failed or timed out
+    """
+    for attempt in range(PACING_MAX_RETRIES + 1):
+        async with semaphore:
+            if window_limiter is not None:
+                await window_limiter.acquire()
+            await bucket.acquire()
+            try:
+                # formatDate=1 for 'yyyyMMdd HH:mm:ss', 2 for seconds since epoch.
+                # For smaller timeframes, the time part becomes more important.
+                # util.df handles date conversion well.
+                bars = await ib.reqHistoricalDataAsync(
+                    contract,
+                    endDateTime=end_datetime_str,  # Use calculated end date or empty for most recent
+                    durationStr=hist_duration,
+                    barSizeSetting=bar_size,
+                    whatToShow=WHAT_TO_SHOW,
+                    useRTH=use_rth,  # Use the calculated RTH setting
+                    formatDate=2,  # Use formatDate=2 for UTC timezone-aware datetime objects (better for intraday)
+                    timeout=REQUEST_TIMEOUT,
+                )
+            except RequestError as e:
+                if is_no_data(e):
+                    # "HMDS query returned no data": an empty window (e.g. overnight or a weekend)
+                    return []
+                if not is_pacing_violation(e) or attempt == PACING_MAX_RETRIES:
+                    logger.error("ERROR (%s): IBKR error %s: %s", contract.symbol, e.code, e.message)
+                    return None
+            else:
+                # ib_async returns an empty list when the request times out, while IBKR
+                # reports a genuine absence of data as an error; an empty result must not
+                # be mistaken for (and cached as) a window without bars
+                if not bars:
+                    logger.error("ERROR (%s): Historical data request timed out after %ss", contract.symbol, REQUEST_TIMEOUT)
+                    return None
+                return bars
+
+        delay = PACING_BACKOFF_SECONDS * 2 ** attempt
+        logger.warning("Pacing violation for %s, retrying in %.0fs...", contract.symbol, delay)
+        await asyncio.sleep(delay)
+
+    return None
+
+
+def bars_to_frame(bars):
+    """
+    Build the raw OHLCV DataFrame directly from a list of bars.
+    
+    Bars are copied in a single pass into one preallocated array per BAR_DTYPE
+    column, which the DataFrame then wraps without copying. This avoids util.df's
+    intermediate tuple/dict per bar and pandas' row-wise construction.
+    
+    Returns:
+        DataFrame with date, open, high, low, close and volume columns. Intraday
+        dates are UTC-aware; daily+ dates are naive calendar dates.
+    """
+    if not bars:
+        return None
+    
+    count = len(bars)
+    columns = {name: np.empty(count, dtype=BAR_DTYPE[name]) for name in BAR_DTYPE.names}
+    dates, opens, highs, lows, closes, volumes = columns.values()
+    is_intraday = isinstance(bars[0].date, datetime)
+    
+    if is_intraday:
+        # Intraday bars are UTC-aware datetimes with formatDate=2; store as epoch seconds
+        dates = dates.view('int64')
+        for i, bar in enumerate(bars):
+            dates[i] = bar.date.timestamp()
+            opens[i] = bar.open
+            highs[i] = bar.high
+            lows[i] = bar.low
+            closes[i] = bar.close
+            volumes[i] = bar.volume
+    else:
+        # Daily and longer bars carry datetime.date objects
+        for i, bar in enumerate(bars):
+            dates[i] = bar.date
+            opens[i] = bar.open
+            highs[i] = bar.high
+            lows[i] = bar.low
+            closes[i] = bar.close
+            volumes[i] = bar.volume
+    
+    df = pd.DataFrame(columns, copy=False)
+    
+    if is_intraday:
+        df['date'] = df['date'].dt.tz_localize('UTC')
+    
+    return df
+
+
+def fits_int32(values):
+    """Check whether integer-valued data fits in int32."""
+    info = np.iinfo(np.int32)
+    return len(values) == 0 or (values.min() >= info.min and values.max() <= info.max)
+
+
+def apply_precision(columns, precision):
+    """
+    Narrow the numeric column dtypes before writing.
+    
+    With 'f32', float64 price columns are stored as float32, which holds more
+    significant digits than IBKR transmits for typical instruments. Whole-number
+    volumes and any int64 columns are stored as int32 when they fit, otherwise
+    int64; fractional volumes are left as floats.
     
     Args:
-        symbol: Target symbol (uses global TARGET_SYMBOL if None)
-        timeframe: Bar size (e.g., '1 min', '1 day') (uses '1 day' if None) 
+        columns: Dict of column name to numpy array, including a 'Volume' column
+        precision: 'f32' or 'f64'
+        
+    Returns:
+        dict: Column name to array with narrowed dtypes (unchanged arrays are not copied)
+    """
+    narrowed = {}
+    for name, values in columns.items():
+        if name == 'Volume' and values.dtype.kind == 'f':
+            if np.isfinite(values).all() and (values == np.floor(values)).all():
+                values = values.astype(np.int32 if fits_int32(values) else np.int64)
+        elif values.dtype == np.float64 and precision == 'f32':
+            values = values.astype(np.float32)
+        elif values.dtype == np.int64 and fits_int32(values):
+            values = values.astype(np.int32)
+        narrowed[name] = values
+    return narrowed
+
+
+def numeric_format(dtype):
+    """
+    Get the printf-style format for a numeric column.
+    
+    Floats are written in their shortest round-trip form (format_csv_block widens
+    float32 values with widen_float32 first) and integers without a decimal point.
+    """
+    if pd.api.types.is_integer_dtype(dtype):
+        return '%d'
+    return '%r'
+
+
+class BackgroundWriter(io.RawIOBase):
+    """
+    Binary file-like object that hands writes to a background thread.
+    
+    The caller can format the next block of output while the previous one is
+    being written to disk. At most ASYNC_WRITE_QUEUE_SIZE blocks are queued, so
+    memory use stays bounded. Errors from the writer thread are raised on the
+    next write or on close.
+    """
+    
+    mode = 'wb'
+    
+    def __init__(self, raw):
+        super().__init__()
+        self.raw = raw
+        self.error = None
+        self.queue = queue.Queue(maxsize=ASYNC_WRITE_QUEUE_SIZE)
+        self.thread = threading.Thread(target=self.run, name='output-writer', daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            if self.error is None:
+                try:
+                    self.raw.write(data)
+                except Exception as e:
+                    self.error = e
+    
+    def write(self, data):
+        if self.error is not None:
+            raise self.error
+        # Copy, since callers may reuse the underlying buffer once write() returns
+        data = bytes(data)
+        self.queue.put(data)
+        return len(data)
+    
+    def writable(self):
+        return True
+    
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+@contextmanager
+def open_output_file(filename, async_io=False):
+    """
+    Open a file for binary output with a large write buffer.
+    
+    With async_io, writes go through a BackgroundWriter so formatting and disk
+    writes overlap. For regular files where posix_fadvise is available (Linux),
+    the kernel is told afterwards that the written pages will not be read again,
+    so large one-off exports do not crowd other data out of the page cache.
+    """
+    with open(filename, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f:
+        if async_io:
+            writer = BackgroundWriter(f)
+            try:
+                yield writer
+            finally:
+                writer.close()
+        else:
+            yield f
+        f.flush()
+        # Pipes and devices (e.g. -o /dev/stdout) reject fadvise with ESPIPE
+        if hasattr(os, 'posix_fadvise') and stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+
+
+def widen_float32(values):
+    """
+    Widen float32 values to the float64 values of their shortest decimal form.
+    
+    %r on the result prints the digits repr(np.float32) and pyarrow write (22.109026
+    rather than 22.10902976989746). Each value is rounded to 1, 2, ... 9 significant
+    digits until the rounded value converts back to the same float32; the nearest
+    decimal with the fewest digits is the shortest round-trip form.
+    """
+    exact = values.astype(np.float64)
+    widened = exact.copy()
+    pending = np.flatnonzero(np.isfinite(exact) & (exact != 0))
+    exponent = np.floor(np.log10(np.abs(exact[pending])))
+    
+    # Powers of ten are only exact up to 1e22; the few values too small or large for
+    # that go through numpy's (much slower) shortest string form instead
+    extreme = (exponent < -14) | (exponent > 22)
+    widened[pending[extreme]] = values[pending[extreme]].astype(str).astype(np.float64)
+    pending, exponent = pending[~extreme], exponent[~extreme]
+    
+    for digits in range(1, 10):
+        if not len(pending):
+            break
+        value = exact[pending]
+        # Scale by an exact power of ten so the rounded result is correctly rounded
+        places = digits - 1 - exponent
+        scale = np.power(10.0, np.abs(places))
+        rounded = np.where(places >= 0, np.round(value * scale) / scale, np.round(value / scale) * scale)
+        with np.errstate(over='ignore'):
+            done = rounded.astype(np.float32) == values[pending]
+        widened[pending[done]] = rounded[done]
+        pending, exponent = pending[~done], exponent[~done]
+    
+    return widened
+
+
+def format_csv_block(row_format, block):
+    """
+    Format one block of rows as CSV bytes.
+    
+    float32 values are widened with widen_float32, so %r prints the digits pyarrow
+    writes (22.109026, not 22.10902976989746), and whole-number floats lose their
+    '.0' suffix, also as in pyarrow's output.
+    
+    Args:
+        row_format: printf-style template for one row, ending in a newline
+        block: List of equally long column arrays
+        
+    Returns:
+        bytes: The formatted rows
+    """
+    block = [
+        (widen_float32(values) if values.dtype == np.float32 else values).tolist()
+        for values in block
+    ]
+    # Interleave the columns row by row so the whole block formats in one pass
+    cells = tuple(itertools.chain.from_iterable(zip(*block)))
+    return WHOLE_FLOAT_SUFFIX_PATTERN.sub(b'', ((row_format * len(block[0])) % cells).encode())
+
+
+def format_csv_blocks_parallel(row_format, blocks):
+    """
+    Format CSV blocks in worker processes, yielding the results in order.
+    
+    Blocks are split by rows rather than by column, so each worker returns one
+    finished bytes object and nothing has to be interleaved afterwards. At most
+    two blocks per worker are in flight to keep memory bounded.
+    """
+    # spawn is safe to use from the save worker threads on every platform
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=PARALLEL_FORMAT_WORKERS, mp_context=context) as pool:
+        pending = deque()
+        for block in blocks:
+            pending.append(pool.submit(format_csv_block, row_format, block))
+            if len(pending) >= 2 * PARALLEL_FORMAT_WORKERS:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def fast_numeric_to_csv(df_output, filename, chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Write a DataFrame with a preformatted first column and numeric remaining columns as CSV.
+    
+    Each block of rows is formatted with a single %-operation on one row template,
+    instead of pandas' generic per-cell writer. The formatting itself runs in
+    CPython's C printf-style formatter; per-column alternatives such as
+    np.char.mod measured several times slower. Large frames are formatted in
+    worker processes on multi-core machines.
+    
+    Args:
+        df_output: DataFrame whose first column holds strings and the rest numbers
+        filename: Target filename
+        chunksize: Rows formatted and written per block
+        async_io: If True, write blocks from a background thread
+    """
+    row_format = ','.join(['%s'] + [numeric_format(dtype) for dtype in df_output.dtypes.iloc[1:]]) + '\n'
+    columns = [df_output[column].to_numpy() for column in df_output.columns]
+    blocks = ([column[start:start + chunksize] for column in columns] for start in range(0, len(df_output), chunksize))
+    
+    if len(df_output) >= PARALLEL_FORMAT_MIN_ROWS and PARALLEL_FORMAT_WORKERS > 1:
+        formatted = format_csv_blocks_parallel(row_format, blocks)
+    else:
+        formatted = (format_csv_block(row_format, block) for block in blocks)
+    
+    with open_output_file(filename, async_io) as f:
+        f.write((','.join(df_output.columns) + '\n').encode())
+        for data in formatted:
+            f.write(data)
+
+
+def to_csv_arrow(df_output, filename, chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Write a DataFrame as CSV with pyarrow's native (multithreaded C++) writer.
+    
+    The Arrow table is built straight from the column arrays, so numeric columns
+    are wrapped without copying and no pandas metadata is attached.
+    
+    Args:
+        df_output: DataFrame to write
+        filename: Target filename
+        chunksize: Rows per record batch
+        async_io: If True, write batches from a background thread
+        
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    
+    table = pa.table({column: pa.array(df_output[column].to_numpy()) for column in df_output.columns})
+    write_options = pacsv.WriteOptions(include_header=False, quoting_style='none')
+    
+    with open_output_file(filename, async_io) as f:
+        # The header is written separately so it stays unquoted like pandas'
+        f.write((','.join(df_output.columns) + '\n').encode())
+        with pacsv.CSVWriter(f, table.schema, write_options=write_options) as writer:
+            for batch in table.to_batches(max_chunksize=chunksize):
+                writer.write_batch(batch)
+
+
+def write_output(df_output, filename, output_format, chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Write the output DataFrame in the requested format.
+    
+    CSV output is written in blocks of chunksize rows, so the text form of the
+    whole frame is never held in memory at once.
+    
+    Args:
+        df_output: DataFrame with formatted OHLCV columns
+        filename: Target filename
+        output_format: 'csv', 'parquet', or 'feather'
+        chunksize: Rows per block for CSV output
+        async_io: If True, overlap CSV formatting with disk writes using a background thread
+    """
+    # to_csv(index=False) is far slower on non-Range (e.g. MultiIndex) frames
+    # than on a flat RangeIndex, see pandas GH#59312
+    if not isinstance(df_output.index, pd.RangeIndex):
+        df_output = df_output.reset_index(drop=True)
+    
+    if output_format == 'csv':
+        try:
+            to_csv_arrow(df_output, filename, chunksize, async_io)
+        except ImportError:
+            if all(pd.api.types.is_numeric_dtype(dtype) for dtype in df_output.dtypes.iloc[1:]):
+                fast_numeric_to_csv(df_output, filename, chunksize, async_io)
+            else:
+                # Dates are already formatted as strings, so pandas can write blocks of rows directly
+                with open_output_file(filename, async_io) as f:
+                    df_output.to_csv(f, index=False, chunksize=chunksize, lineterminator='\n')
+        return
+    
+    import pyarrow as pa
+    
+    table = pa.Table.from_pandas(df_output, preserve_index=False)
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, filename, compression='zstd', use_dictionary=True)
+    elif output_format == 'feather':
+        import pyarrow.feather as feather
+        feather.write_feather(table, filename, compression='zstd')
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}. Please use one of: {', '.join(OUTPUT_FORMATS)}")
+
+
+def print_no_data_hints(symbol, bar_size):
+    """Explain the common reasons for an empty historical data response."""
+    lines = [
+        f"No historical data received for {symbol}. This could be due to several reasons:",
+        "  - No data available for the requested contract or period.",
+        "  - Market data subscriptions might be required for this specific data.",
+        "  - Incorrect contract details or parameters.",
+        f"  - {bar_size} data may not be available if the duration is too short or data restrictions apply.",
+    ]
+    if bar_size in SMALL_BARS:
+        lines.append("  - Remember: Bars 30 seconds or smaller older than 6 months are not available from IBKR.")
+    logger.warning("\n".join(lines))
+
+
+def print_permission_error(filename):
+    """Explain why an output file could not be written."""
+    logger.error("\n".join([
+        f"ERROR: Permission denied while saving file: {filename}",
+        "Possible causes:",
+        "  - File is currently open in Excel or another application",
+        "  - Insufficient write permissions in the directory",
+        "  - File is marked as read-only",
+        "Solutions:",
+        "  - Close the file in any applications and try again",
+        "  - Run the script as administrator",
+        "  - Choose a different output directory",
+    ]))
+
+
+def write_bars_frame(bars_df, filename, bar_size, target_timezone, tz_name, output_format='csv', precision='f32',
+                     chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Format a raw bar DataFrame and write it in the requested output format.
+    
+    Runs in a SAVE_EXECUTOR worker thread, so it must not prompt or print.
+
+    Args:
+        bars_df: DataFrame from bars_to_frame (date, open, high, low, close, volume)
+        filename: Target filename (conflicts already resolved)
+        bar_size: Bar size used for the request
+        target_timezone: tzinfo object for timestamp conversion
+        tz_name: Timezone abbreviation used in the intraday date column header
+        output_format: 'csv', 'parquet', or 'feather'
+        precision: 'f32' or 'f64' price precision
+        chunksize: Rows per block for CSV output
+        async_io: If True, overlap CSV formatting with disk writes
+    """
+    # Determine if this is intraday data that needs timestamps
+    is_intraday = is_intraday_timeframe(bar_size)
+
+    # Use appropriate column naming based on timeframe and timezone
+    if is_intraday:
+        # For intraday data, include timezone info in column name
+        date_column_name = f'DateTime_{tz_name}'
+    else:
+        # For daily+ data, timezone is less relevant
+        date_column_name = 'Date'
+
+    # save_bars has already checked that the dates are datetime64
+    if output_format == 'csv':
+        # Format the date/datetime column with timezone awareness straight from the raw values
+        date_values = format_timezone_aware_datetime(bars_df['date'], target_timezone, is_intraday).to_numpy()
+    elif is_intraday:
+        # Typed columnar formats store real timestamps, converted to the target timezone
+        date_values = convert_datetime_column(bars_df['date'], target_timezone).array
+    else:
+        # Daily+ bars are naive calendar dates and need no conversion
+        date_values = bars_df['date'].array
+    columns = {date_column_name: date_values}
+    columns.update({OUTPUT_COLUMN_NAMES[name]: bars_df[name].to_numpy() for name in BAR_DTYPE.names[1:]})
+
+    # Narrow numeric dtypes (smaller files and less formatting work), then build the
+    # output frame once instead of renaming and reassigning columns of the raw frame
+    df_output = pd.DataFrame(apply_precision(columns, precision), copy=False)
+
+    write_output(df_output, filename, output_format, chunksize, async_io)
+    stat_cached.cache_clear()
+
+
+async def save_bars(bars_df, symbol, bar_size, output_filename, overwrite, target_timezone, tz_name, output_format='csv',
+                    precision='f32', chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Store a raw bar DataFrame in the requested output format.
+    
+    File conflicts are resolved on the event loop thread; formatting and writing
+    run in SAVE_EXECUTOR so the loop keeps receiving bars for other requests.
+
+    Args:
+        bars_df: DataFrame from bars_to_frame (date, open, high, low, close, volume), or None
+        symbol: Symbol the bars belong to
+        bar_size: Bar size used for the request
+        output_filename: Output filename
+        overwrite: If True, overwrite existing files without prompting
+        target_timezone: tzinfo object for timestamp conversion
+        tz_name: Timezone abbreviation used in the intraday date column header
+        output_format: 'csv', 'parquet', or 'feather'
+        precision: 'f32' or 'f64' price precision
+        chunksize: Rows per block for CSV output
+        async_io: If True, overlap CSV formatting with disk writes
+    """
+    if bars_df is None or bars_df.empty:
+        print_no_data_hints(symbol, bar_size)
+        return
+
+    logger.info("Successfully received %d bars of data for %s.", len(bars_df), symbol)
+
+    # bars_to_frame always yields datetime64 dates (UTC-aware for intraday bars requested
+    # with formatDate=2); checking the dtype is O(1), so the warning path costs nothing
+    # normally and fails before a file is created otherwise
+    date_dtype = bars_df['date'].dtype
+    if not pd.api.types.is_datetime64_any_dtype(date_dtype):
+        # Only reachable if a future ib_async version changes the bar date type
+        logger.warning("Expected datetime64 date column with formatDate=2, got %s", date_dtype)
+        raise ValueError(f"Unexpected date column type: {date_dtype}")
+
+    # Handle file conflicts before saving
+    final_filename, should_proceed = handle_file_conflict(output_filename, overwrite)
+
+    if not should_proceed:
+        logger.warning("Data download was successful but file was not saved due to user cancellation.")
+        return
+
+    # Save to output file
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            SAVE_EXECUTOR, write_bars_frame, bars_df, final_filename, bar_size, target_timezone, tz_name,
+            output_format, precision, chunksize, async_io
+        )
+        # Always shown: this is where a run reports its (possibly generated) output filename
+        print(f"SUCCESS: Historical OHLCV data for {symbol} saved to: {final_filename}")
+    except PermissionError as e:
+        print_permission_error(final_filename)
+        raise e
+
+
+def format_bar_dates(bars, target_timezone, is_intraday):
+    """
+    Format the dates of a list of bars in one vectorized pass.
+    
+    Args:
+        bars: List of bars returned by reqHistoricalDataAsync
+        target_timezone: tzinfo object for timestamp conversion
+        is_intraday: Boolean indicating if this is intraday data
+        
+    Returns:
+        list: Formatted date strings, one per bar
+    """
+    if is_intraday:
+        # Intraday bars are UTC-aware datetimes; convert via epoch seconds instead of per-row strftime
+        seconds = np.fromiter((int(bar.date.timestamp()) for bar in bars), dtype='int64', count=len(bars))
+        utc_series = pd.Series(seconds.astype('datetime64[s]')).dt.tz_localize('UTC')
+        return format_timezone_aware_datetime(utc_series, target_timezone, is_intraday).tolist()
+    
+    # Daily+ bars carry plain dates
+    return np.datetime_as_string(np.array([bar.date for bar in bars], dtype='datetime64[D]'), unit='D').tolist()
+
+
+def write_bars_streaming(bars, filename, date_column_name, target_timezone, is_intraday, chunksize=CSV_CHUNK_SIZE):
+    """
+    Write bars to CSV without building a DataFrame.
+    
+    Bars are written in blocks of chunksize rows, with the dates of each block
+    formatted in one vectorized pass, so memory use stays bounded regardless of
+    the number of bars. Prices are written exactly as received; whole-number
+    volumes are written as integers.
+    
+    Args:
+        bars: List of bars returned by reqHistoricalDataAsync
+        filename: Target filename
+        date_column_name: Header for the date column
+        target_timezone: tzinfo object for timestamp conversion
+        is_intraday: Boolean indicating if this is intraday data
+        chunksize: Rows per block
+    """
+    with open(filename, 'w', newline='', buffering=STREAMING_CSV_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow((date_column_name, 'Open', 'High', 'Low', 'Close', 'Volume'))
+        for start in range(0, len(bars), chunksize):
+            block = bars[start:start + chunksize]
+            dates = format_bar_dates(block, target_timezone, is_intraday)
+            writer.writerows(
+                (
+                    date, bar.open, bar.high, bar.low, bar.close,
+                    int(bar.volume) if float(bar.volume).is_integer() else bar.volume
+                )
+                for date, bar in zip(dates, block)
+            )
+
+
+async def save_bars_streaming(bars, symbol, bar_size, output_filename, overwrite, target_timezone, tz_name,
+                              chunksize=CSV_CHUNK_SIZE):
+    """
+    Store received bars as CSV using write_bars_streaming in a SAVE_EXECUTOR thread.
+    
+    Args:
+        bars: List of bars returned by reqHistoricalDataAsync
+        symbol: Symbol the bars belong to
+        bar_size: Bar size used for the request
+        output_filename: Output filename
+        overwrite: If True, overwrite existing files without prompting
+        target_timezone: tzinfo object for timestamp conversion
+        tz_name: Timezone abbreviation used in the intraday date column header
+        chunksize: Rows per block
+    """
+    if not bars:
+        print_no_data_hints(symbol, bar_size)
+        return
+
+    logger.info("Successfully received %d bars of data for %s.", len(bars), symbol)
+
+    is_intraday = is_intraday_timeframe(bar_size)
+    date_column_name = f'DateTime_{tz_name}' if is_intraday else 'Date'
+
+    final_filename, should_proceed = handle_file_conflict(output_filename, overwrite)
+
+    if not should_proceed:
+        logger.warning("Data download was successful but file was not saved due to user cancellation.")
+        return
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            SAVE_EXECUTOR, write_bars_streaming, bars, final_filename, date_column_name, target_timezone,
+            is_intraday, chunksize
+        )
+        stat_cached.cache_clear()
+        # Always shown: this is where a run reports its (possibly generated) output filename
+        print(f"SUCCESS: Historical OHLCV data for {symbol} saved to: {final_filename}")
+    except PermissionError as e:
+        print_permission_error(final_filename)
+        raise e
+
+
+async def fetch_window_frames(ib, contract, request_windows, bar_size, use_rth, semaphore, bucket, window_limiter=None):
+    """
+    Request all windows and combine their bars into one DataFrame.
+    
+    Each window's bars are converted with bars_to_frame in SAVE_EXECUTOR as soon
+    as they arrive, so the conversion overlaps with receiving the remaining
+    windows instead of starting after the last one.
+    
+    Returns:
+        DataFrame with the combined bars, or None if there are none
+        
+    Raises:
+        LookupError: If any window failed
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def fetch_window(window_end, window_duration):
+        bars = await request_historical_bars(
+            ib, contract, window_end, window_duration, bar_size, use_rth, semaphore, bucket, window_limiter
+        )
+        if bars is None:
+            return None
+        return await loop.run_in_executor(SAVE_EXECUTOR, bars_to_frame, bars) if bars else []
+    
+    # One request per window, all sharing the semaphore and pacing limiters
+    windows = await asyncio.gather(*(
+        fetch_window(window_end, window_duration) for window_end, window_duration in request_windows
+    ))
+    raise_for_failed_windows(windows)
+    
+    frames = [frame for frame in windows if len(frame)]
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    
+    # Windows are in chronological order; drop bars repeated where adjacent windows overlap
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset='date').sort_values('date', ignore_index=True)
+
+
+async def fetch_cached_frame(ib, contract, symbol, cache, request_range, bar_size, use_rth, semaphore, bucket,
+                             window_limiter=None):
+    """
+    Fetch bars for a request range through the on-disk cache.
+    
+    Days already in the cache are read from disk; only the remaining ranges are
+    downloaded, and newly completed days are written back to the cache.
+    
+    Returns:
+        DataFrame with the combined bars, or None if there are none
+    """
+    # Request ranges are naive TWS local time (assumed to be the system timezone, as ib_async does)
+    utc = get_zoneinfo('UTC')
+    start, end = (moment.astimezone(utc) for moment in request_range)
+    
+    cached_days, missing_spans = cache.plan(start, end)
+    if cached_days:
+        logger.info("%s: %d day(s) served from cache, %d range(s) to download", symbol, len(cached_days), len(missing_spans))
+    
+    request_windows = [
+        window for span_start, span_end in missing_spans
+        for window in split_request_window(span_start, span_end, bar_size)
+    ]
+    # Raises before anything is stored if a request failed, so failures are never cached as days without data
+    fetched = await fetch_window_frames(
+        ib, contract, request_windows, bar_size, use_rth, semaphore, bucket, window_limiter
+    )
+    cache.store(fetched, missing_spans)
+    
+    frames = [frame for frame in (fetched, cache.load(cached_days)) if frame is not None and not frame.empty]
+    if not frames:
+        return None
+    
+    combined = pd.concat(frames, ignore_index=True).drop_duplicates(subset='date').sort_values('date', ignore_index=True)
+    # Missing spans are requested in whole days, so clip to the requested range to make
+    # the result independent of which days happened to be cached
+    in_range = (combined['date'] >= start) & (combined['date'] <= end)
+    if in_range.all():
+        return combined
+    combined = combined[in_range].reset_index(drop=True)
+    return combined if not combined.empty else None
+
+
+async def fetch_and_save_symbol(ib, contract, symbol, request_windows, bar_size, use_rth,
+                                semaphore, bucket, output_filename, overwrite, target_timezone, tz_name, output_format,
+                                precision, cache=None, request_range=None, streaming_csv=False,
+                                chunksize=CSV_CHUNK_SIZE, async_io=False, window_limiter=None):
+    """Fetch historical bars for a single qualified contract and save them to disk."""
+    try:
+        if cache is not None:
+            bars_df = await fetch_cached_frame(
+                ib, contract, symbol, cache, request_range, bar_size, use_rth, semaphore, bucket, window_limiter
+            )
+        elif streaming_csv:
+            # One request per window, all sharing the semaphore and pacing limiters
+            windows = await asyncio.gather(*(
+                request_historical_bars(
+                    ib, contract, window_end, window_duration, bar_size, use_rth, semaphore, bucket, window_limiter
+                )
+                for window_end, window_duration in request_windows
+            ))
+            bars = merge_bar_windows(windows)
+            await save_bars_streaming(bars, symbol, bar_size, output_filename, overwrite, target_timezone, tz_name,
+                                      chunksize)
+            return
+        else:
+            bars_df = await fetch_window_frames(
+                ib, contract, request_windows, bar_size, use_rth, semaphore, bucket, window_limiter
+            )
+        await save_bars(bars_df, symbol, bar_size, output_filename, overwrite, target_timezone, tz_name, output_format, precision,
+                        chunksize, async_io)
+    except (LookupError, ValueError) as e:
+        logger.error("ERROR (%s): %s", symbol, e)
+    except Exception as e:
+        logger.exception("An unexpected error occurred for %s: %s", symbol, e)
+
+
+async def fetch_many_async(symbols, timeframe=None, duration=None, output_filename=None, overwrite=False, timezone_choice='market', start_date=None, end_date=None, include_extended_hours=False, output_format=None, precision='f32', cache_dir=None, streaming_csv=False, chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Connects to IBKR once, fetches historical OHLC data for all symbols concurrently,
+    and stores each symbol in its own output file.
+
+    Requests are bounded by MAX_CONCURRENT_REQUESTS simultaneous requests and
+    paced through a shared token bucket (PACING_REQUESTS per PACING_PERIOD seconds).
+    Bar sizes of 30 secs or less are further limited to SMALL_BAR_PACING_REQUESTS
+    requests in any SMALL_BAR_PACING_PERIOD seconds, shared across symbols.
+
+    Args:
+        symbols: List of target symbols (uses global TARGET_SYMBOL if empty)
+        timeframe: Bar size (e.g., '1 min', '1 day') (uses '1 day' if None)
         duration: History duration (e.g., '1 Y', '30 D') (uses global HISTORY_DURATION if None)
-        output_filename: Output CSV filename (auto-generated if None)
+        output_filename: Output filename, only valid for a single symbol (auto-generated if None)
         overwrite: If True, overwrite existing files without prompting
         timezone_choice: 'UTC', 'market', or 'local' for timestamp timezone
         start_date: Start date string for date range requests
         end_date: End date string for date range requests
         include_extended_hours: If True, include extended trading hours data
+        output_format: 'csv', 'parquet', or 'feather' (chosen by resolve_output_format if None)
+        precision: 'f32' or 'f64' price precision
+        cache_dir: Directory for the on-disk intraday bar cache (disabled if None)
+        streaming_csv: If True, write CSV rows directly from the bars without a DataFrame
+        chunksize: Rows per block for CSV output
+        async_io: If True, overlap CSV formatting with disk writes using a background thread
     """
     # Use provided parameters or fall back to defaults
-    target_symbol = symbol if symbol is not None else TARGET_SYMBOL
+    target_symbols = list(symbols) if symbols else [TARGET_SYMBOL]
     bar_size = timeframe if timeframe is not None else '1 day'
     default_duration = duration if duration is not None else HISTORY_DURATION
-    
+
+    if output_filename is not None and len(target_symbols) > 1:
+        logger.error("ERROR: An output filename can only be specified when downloading a single symbol.")
+        return
+
+    output_format = resolve_output_format(output_format, output_filename, streaming_csv)
+
+    if streaming_csv and output_format != 'csv':
+        logger.error("ERROR: Streaming CSV output can only be used with the csv format.")
+        return
+
+    if output_format != 'csv' or cache_dir:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            feature = 'The bar cache' if cache_dir else f"{output_format} output"
+            logger.error("ERROR: %s requires pyarrow. Install it with: pip install pyarrow", feature)
+            return
+
     # Process date arguments to determine actual duration and end date
     try:
         end_datetime_str, hist_duration, date_info = process_date_arguments(start_date, end_date, default_duration, include_extended_hours)
     except ValueError as e:
-        print(f"ERROR: {e}")
+        logger.error("ERROR: %s", e)
         return
-    
+
     # Display date processing information
-    if date_info['mode'] == 'date_range':
-        print(f"Date range mode: {date_info['start_date']} to {date_info['end_date']}")
-        print(f"Calculated duration: {date_info['calculated_duration']}")
-    elif date_info['mode'] == 'single_day':
-        print(f"Single day mode: {date_info['target_date']}")
-    elif date_info['mode'] == 'duration_with_end':
-        print(f"Duration with end date: {date_info['duration']} ending at {date_info['end_date']}")
-    
+    if date_info.mode is Mode.DATE_RANGE:
+        logger.info("Date range mode: %s to %s", date_info.start_date, date_info.end_date)
+        logger.info("Calculated duration: %s", date_info.duration)
+    elif date_info.mode is Mode.SINGLE_DAY:
+        logger.info("Single day mode: %s", date_info.start_date)
+    elif date_info.mode is Mode.DURATION_WITH_END:
+        logger.info("Duration with end date: %s ending at %s", date_info.duration, date_info.end_date)
+
     # Determine RTH setting (Regular Trading Hours)
     use_rth = not include_extended_hours
-    
+
+    # The cache stores whole UTC days, which only makes sense for intraday bars
+    if cache_dir and not is_intraday_timeframe(bar_size):
+        logger.warning("Note: The bar cache only applies to intraday timeframes; downloading %s bars directly.", bar_size)
+        cache_dir = None
+
+    if streaming_csv and cache_dir:
+        logger.warning("Note: Cached bars are combined in a DataFrame, so --streaming-csv is ignored with --cache-dir.")
+        streaming_csv = False
+
+    # Resolve the output timezone and its display name once for all symbols
+    now = datetime.now(tz=get_zoneinfo('UTC'))
+    target_timezone = get_target_timezone(timezone_choice, target_symbols[0])
+    tz_name = get_timezone_name(timezone_choice, target_timezone, now)
+
     # Validate parameters and show warnings
     warnings = validate_timeframe_duration(bar_size, hist_duration)
     for warning in warnings:
-        print(warning)
-    
-    # Generate output filename if not provided
-    if output_filename is None:
-        future_month = FUTURE_LAST_TRADE_DATE_OR_CONTRACT_MONTH if SECURITY_TYPE == "FUT" else None
-        output_filename = generate_filename(target_symbol, SECURITY_TYPE, hist_duration, bar_size, future_month, include_extended_hours)
-    
-    ib = IB()
+        logger.warning(warning)
 
+    # Split long histories into windows that are fetched concurrently
+    try:
+        request_windows = plan_request_windows(end_datetime_str, hist_duration, bar_size)
+        request_range = get_request_range(end_datetime_str, hist_duration)
+    except ValueError as e:
+        logger.error("ERROR: %s", e)
+        return
 
     try:
-        print(f"Attempting to connect to IBKR at {IB_HOST}:{IB_PORT} with Client ID {CLIENT_ID}...")
-        ib.connect(IB_HOST, IB_PORT, clientId=CLIENT_ID, timeout=15) # Connection timeout
-        print("Successfully connected to IBKR.")
-
-        contract = create_contract(target_symbol, SECURITY_TYPE)
-
-        # Qualify the contract (important to resolve ambiguities and get full contract details)
-        print("Qualifying contract...")
-        qualified_contracts = ib.qualifyContracts(contract)
-        if not qualified_contracts:
-            raise LookupError(
-                f"Contract for {TARGET_SYMBOL} ({SECURITY_TYPE}) could not be qualified. "
-                "Please check symbol, security type, exchange, and other parameters."
-            )
-        qualified_contract = qualified_contracts[0] # Use the first qualified contract
-        print(f"Contract qualified: {qualified_contract.localSymbol} on {qualified_contract.exchange} (conId: {qualified_contract.conId})")
-
-        print(f"\nRequesting historical data for {qualified_contract.symbol}:")
-        print(f"  Duration: {hist_duration}")
-        print(f"  Bar size: {bar_size}")
-        print(f"  Data type: {WHAT_TO_SHOW}")
-        print(f"  Regular Trading Hours: {use_rth}")
+        # Reuses the connection from a previous download in this process if still open
+        ib = await IBConnectionPool.get(CLIENT_ID)
+
+        contracts = [create_contract(symbol, SECURITY_TYPE) for symbol in target_symbols]
+
+        # Qualify all contracts in one batch (important to resolve ambiguities and get full contract details)
+        logger.info("Qualifying %d contract(s)...", len(contracts))
+        # With request errors raised, one unknown symbol would abort the whole batch;
+        # unqualified contracts are reported one by one below instead
+        ib.RaiseRequestErrors = False
+        await ib.qualifyContractsAsync(*contracts)
+        # Surface history request errors as exceptions so pacing violations can be retried
+        ib.RaiseRequestErrors = True
+
+        jobs = []
+        for symbol, contract in zip(target_symbols, contracts):
+            # Qualification fills in conId on success
+            if not contract.conId:
+                logger.error(
+                    "ERROR: Contract for %s (%s) could not be qualified. "
+                    "Please check symbol, security type, exchange, and other parameters.", symbol, SECURITY_TYPE
+                )
+                continue
+            logger.info("Contract qualified: %s on %s (conId: %s)", contract.localSymbol, contract.exchange, contract.conId)
+            jobs.append((symbol, contract))
+
+        if not jobs:
+            raise LookupError("None of the requested contracts could be qualified.")
+
+        request_info = [
+            f"Requesting historical data for {', '.join(contract.symbol for _, contract in jobs)}:",
+            f"  Duration: {hist_duration}",
+            f"  Bar size: {bar_size}",
+            f"  Data type: {WHAT_TO_SHOW}",
+            f"  Regular Trading Hours: {use_rth}",
+        ]
         if include_extended_hours:
-            print("  Extended Hours: Included (pre-market and after-hours data)")
+            request_info.append("  Extended Hours: Included (pre-market and after-hours data)")
         if end_datetime_str:
-            print(f"  End DateTime: {end_datetime_str}")
-        
+            request_info.append(f"  End DateTime: {end_datetime_str}")
+        if len(request_windows) > 1:
+            request_info.append(f"  Split into {len(request_windows)} requests of up to {request_windows[-1][1]} each")
+        total_requests = len(request_windows) * len(jobs)
+        if bar_size in SMALL_BARS and total_requests > SMALL_BAR_PACING_REQUESTS:
+            minutes = (total_requests - 1) // SMALL_BAR_PACING_REQUESTS * SMALL_BAR_PACING_PERIOD / 60
+            request_info.append(
+                f"  Pacing: {total_requests} small-bar requests at {SMALL_BAR_PACING_REQUESTS} per "
+                f"{SMALL_BAR_PACING_PERIOD / 60:.0f} minutes will take at least {minutes:.0f} minutes"
+            )
+
         # Show timezone info for intraday data
         if is_intraday_timeframe(bar_size):
-            target_timezone = get_target_timezone(timezone_choice, target_symbol)
-            tz_name = target_timezone.tzname(datetime.now()) if timezone_choice != 'UTC' else 'UTC'
-            print(f"  Output timezone: {timezone_choice} ({tz_name})")
-
-        # Request historical data
-        # formatDate=1 for 'yyyyMMdd HH:mm:ss', 2 for seconds since epoch.
-        # For smaller timeframes, the time part becomes more important.
-        # util.df handles date conversion well.
-        bars = ib.reqHistoricalData(
-            qualified_contract,
-            endDateTime=end_datetime_str,  # Use calculated end date or empty for most recent
-            durationStr=hist_duration,
-            barSizeSetting=bar_size,
-            whatToShow=WHAT_TO_SHOW,
-            useRTH=use_rth,  # Use the calculated RTH setting
-            formatDate=2,  # Use formatDate=2 for UTC timezone-aware datetime objects (better for intraday)
-            # timeout parameter for reqHistoricalData is also available (default 60s)
-        )
+            request_info.append(f"  Output timezone: {timezone_choice} ({tz_name})")
+        logger.info("\n".join(request_info))
 
-        if not bars:
-            print("\nNo historical data received. This could be due to several reasons:")
-            print("  - No data available for the requested contract or period.")
-            print("  - Market data subscriptions might be required for this specific data.")
-            print("  - Incorrect contract details or parameters.")
-            print(f"  - {bar_size} data may not be available if the duration is too short or data restrictions apply.")
-            if bar_size in ['1 secs', '5 secs', '10 secs', '15 secs', '30 secs']:
-                print("  - Remember: Bars 30 seconds or smaller older than 6 months are not available from IBKR.")
-        else:
-            print(f"\nSuccessfully received {len(bars)} bars of data.")
-
-            # Convert list of bar data to a pandas DataFrame
-            df = util.df(bars)
-
-            if df is not None and not df.empty:
-                # Determine if this is intraday data that needs timestamps
-                is_intraday = is_intraday_timeframe(bar_size)
-                
-                # Get target timezone for timestamp conversion
-                target_timezone = get_target_timezone(timezone_choice, target_symbol)
-                
-                # Standardize column names (util.df usually gives: date, open, high, low, close, volume, average, barCount)
-                df_output = df[['date', 'open', 'high', 'low', 'close', 'volume']].copy()
-                
-                # Use appropriate column naming based on timeframe and timezone
-                if is_intraday:
-                    # For intraday data, include timezone info in column name
-                    tz_abbrev = target_timezone.tzname(datetime.now()) if timezone_choice != 'UTC' else 'UTC'
-                    date_column_name = f'DateTime_{tz_abbrev}'
-                else:
-                    # For daily+ data, timezone is less relevant
-                    date_column_name = 'Date'
-                
-                df_output.rename(columns={
-                    'date': date_column_name,
-                    'open': 'Open',
-                    'high': 'High',
-                    'low': 'Low',
-                    'close': 'Close',
-                    'volume': 'Volume'
-                }, inplace=True)
-
-                # Format the date/datetime column with timezone awareness
-                # The 'date' column from util.df with formatDate=2 should be timezone-aware datetime objects
-                if pd.api.types.is_datetime64_any_dtype(df_output[date_column_name]):
-                    df_output[date_column_name] = format_timezone_aware_datetime(
-                        df_output[date_column_name], target_timezone, is_intraday
-                    )
-                elif df_output[date_column_name].dtype == 'object': # If it's strings
-                    try:
-                        # Try to parse as datetime first, then format with timezone
-                        datetime_series = pd.to_datetime(df_output[date_column_name])
-                        df_output[date_column_name] = format_timezone_aware_datetime(
-                            datetime_series, target_timezone, is_intraday
-                        )
-                    except (ValueError, TypeError):
-                        print(f"Warning: {date_column_name} column could not be parsed. Leaving as is.")
-                # else if it's datetime.date objects, strftime will work if applied row-wise or converted first
-
-                # Handle file conflicts before saving
-                final_filename, should_proceed = handle_file_conflict(output_filename, overwrite)
-                
-                if not should_proceed:
-                    print("Data download was successful but file was not saved due to user cancellation.")
-                    return
-                
-                # Save to CSV file
-                try:
-                    df_output.to_csv(final_filename, index=False)
-                    print(f"SUCCESS: Historical OHLCV data saved to: {final_filename}")
-                except PermissionError as e:
-                    print(f"\nERROR: Permission denied while saving file: {final_filename}")
-                    print("Possible causes:")
-                    print("  - File is currently open in Excel or another application")
-                    print("  - Insufficient write permissions in the directory")
-                    print("  - File is marked as read-only")
-                    print("\nSolutions:")
-                    print("  - Close the file in any applications and try again")
-                    print("  - Run the script as administrator")
-                    print("  - Choose a different output directory")
-                    raise e
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        bucket = TokenBucket(PACING_REQUESTS, PACING_PERIOD)
+        # IBKR allows only 60 requests in any 10 minutes for bars of 30 secs or less
+        window_limiter = SlidingWindowLimiter(SMALL_BAR_PACING_REQUESTS, SMALL_BAR_PACING_PERIOD) if bar_size in SMALL_BARS else None
+
+        tasks = []
+        for symbol, contract in jobs:
+            # Generate output filename if not provided
+            if output_filename is None:
+                future_month = FUTURE_LAST_TRADE_DATE_OR_CONTRACT_MONTH if SECURITY_TYPE == "FUT" else None
+                symbol_filename = generate_filename(symbol, SECURITY_TYPE, hist_duration, bar_size, future_month, include_extended_hours, output_format)
             else:
-                print("Data was received, but the resulting DataFrame is empty or None after processing.")
+                symbol_filename = output_filename
+
+            tasks.append(fetch_and_save_symbol(
+                ib, contract, symbol, request_windows, bar_size, use_rth,
+                semaphore, bucket, symbol_filename, overwrite, target_timezone, tz_name, output_format,
+                precision,
+                cache=BarCache(cache_dir, contract.conId, bar_size, use_rth) if cache_dir else None,
+                request_range=request_range,
+                streaming_csv=streaming_csv,
+                chunksize=chunksize,
+                async_io=async_io,
+                window_limiter=window_limiter
+            ))
+
+        await asyncio.gather(*tasks)
 
     except ConnectionRefusedError:
-        print(f"\nERROR: Connection refused. Ensure IB Gateway or TWS is running on {IB_HOST}:{IB_PORT} and API access is enabled.")
-    except TimeoutError: # Catches generic timeout, ib_async might raise specific IBError for timeouts
-        print(f"\nERROR: Connection to IBKR timed out. Check network or if TWS/Gateway is responsive.")
+        logger.error("ERROR: Connection refused. Ensure IB Gateway or TWS is running on %s:%s and API access is enabled.", IB_HOST, IB_PORT)
+    except (TimeoutError, asyncio.TimeoutError): # Catches generic timeout, ib_async might raise specific IBError for timeouts
+        logger.error("ERROR: Connection to IBKR timed out. Check network or if TWS/Gateway is responsive.")
     except (LookupError, ValueError) as e: # For contract qualification or configuration issues
-        print(f"\nERROR: {e}")
+        logger.error("ERROR: %s", e)
     except Exception as e:
-        print(f"\nAn unexpected error occurred: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        if ib.isConnected():
-            print("\nDisconnecting from IBKR...")
-            ib.disconnect()
-            print("Disconnected.")
-        else:
-            print("\nNo active connection to disconnect or connection was not established.")
+        logger.exception("An unexpected error occurred: %s", e)
+
+
+def fetch_and_save_historical_data(symbol=None, timeframe=None, duration=None, output_filename=None, overwrite=False, timezone_choice='market', start_date=None, end_date=None, include_extended_hours=False, output_format=None, precision='f32', cache_dir=None, streaming_csv=False, chunksize=CSV_CHUNK_SIZE, async_io=False):
+    """
+    Connects to IBKR, fetches historical OHLC data for the specified symbol,
+    timeframe, and duration, and stores it in a CSV (or Parquet/Feather) file.
+
+    Thin synchronous wrapper around fetch_many_async for a single symbol.
+
+    Args:
+        symbol: Target symbol (uses global TARGET_SYMBOL if None)
+        timeframe: Bar size (e.g., '1 min', '1 day') (uses '1 day' if None)
+        duration: History duration (e.g., '1 Y', '30 D') (uses global HISTORY_DURATION if None)
+        output_filename: Output filename (auto-generated if None)
+        overwrite: If True, overwrite existing files without prompting
+        timezone_choice: 'UTC', 'market', or 'local' for timestamp timezone
+        start_date: Start date string for date range requests
+        end_date: End date string for date range requests
+        include_extended_hours: If True, include extended trading hours data
+        output_format: 'csv', 'parquet', or 'feather' (chosen by resolve_output_format if None)
+        precision: 'f32' or 'f64' price precision
+        cache_dir: Directory for the on-disk intraday bar cache (disabled if None)
+        streaming_csv: If True, write CSV rows directly from the bars without a DataFrame
+        chunksize: Rows per block for CSV output
+        async_io: If True, overlap CSV formatting with disk writes using a background thread
+    """
+    target_symbol = symbol if symbol is not None else TARGET_SYMBOL
+    # util.run keeps a persistent event loop, so the pooled connection survives between calls
+    util.run(fetch_many_async(
+        [target_symbol],
+        timeframe=timeframe,
+        duration=duration,
+        output_filename=output_filename,
+        overwrite=overwrite,
+        timezone_choice=timezone_choice,
+        start_date=start_date,
+        end_date=end_date,
+        include_extended_hours=include_extended_hours,
+        output_format=output_format,
+        precision=precision,
+        cache_dir=cache_dir,
+        streaming_csv=streaming_csv,
+        chunksize=chunksize,
+        async_io=async_io
+    ))
+
+
+def prewarm():
+    """
+    Import and exercise the output writers once.
+    
+    pandas and pyarrow set up their CSV and file writers lazily on first use; doing
+    that up front (in a background thread while IBKR is contacted) keeps it off the
+    path of the first saved symbol.
+    """
+    pd.DataFrame({'a': [1.0]}).to_csv(io.StringIO(), index=False)
+    np.datetime_as_string(np.zeros(1, dtype='datetime64[s]'), unit='s')
+    
+    if importlib.util.find_spec('pyarrow') is not None:
+        import pyarrow.csv  # noqa: F401
+        import pyarrow.feather  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+
+
+def install_fast_event_loop():
+    """
+    Use uvloop as the asyncio event loop when it is installed.
+    
+    uvloop is not available on Windows; the standard event loop is kept there
+    and whenever uvloop is not installed.
+    
+    Returns:
+        bool: True if uvloop was installed
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    
+    # Set through the policy so util.run picks up a uvloop loop when it creates one
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
 
 def main():
     """
     Main function that handles command line arguments and calls the data fetching function.
     """
     args = parse_arguments()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(message)s')
+    # ib_async logs every connection step at INFO; keep it to warnings either way
+    logging.getLogger('ib_async').setLevel(logging.WARNING)
+    if not args.verbose:
+        # ib_async logs every IBKR error at ERROR, including the ones handled here
+        for name in ('ib_async.wrapper', 'ib_async.ib'):
+            logging.getLogger(name).addFilter(HandledIBMessageFilter())
+    install_fast_event_loop()
+    threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
     
-    print(f"IBKR Historical Data Downloader")
-    print(f"================================")
-    print(f"Symbol: {args.symbol}")
-    print(f"Timeframe: {args.timeframe}")
-    print(f"Duration: {args.duration}")
-    print(f"Timezone: {args.timezone}")
+    lines = [
+        "IBKR Historical Data Downloader",
+        "================================",
+        f"Symbol: {', '.join(args.symbol)}",
+        f"Timeframe: {args.timeframe}",
+        f"Duration: {args.duration}",
+        f"Timezone: {args.timezone}",
+    ]
     if args.start_date:
-        print(f"Start date: {args.start_date}")
+        lines.append(f"Start date: {args.start_date}")
     if args.end_date:
-        print(f"End date: {args.end_date}")
+        lines.append(f"End date: {args.end_date}")
     if args.eth:
-        print(f"Extended hours: Enabled")
+        lines.append("Extended hours: Enabled")
     if args.output:
-        print(f"Output file: {args.output}")
-    print()
+        lines.append(f"Output file: {args.output}")
+    if args.output_format:
+        lines.append(f"Output format: {args.output_format}")
+    if args.precision != 'f32':
+        lines.append(f"Price precision: {args.precision}")
+    if args.cache_dir:
+        lines.append(f"Cache directory: {args.cache_dir}")
+    if args.streaming_csv:
+        lines.append("Streaming CSV: Enabled")
+    if args.chunksize != CSV_CHUNK_SIZE:
+        lines.append(f"CSV chunk size: {args.chunksize} rows")
+    if args.async_io:
+        lines.append("Async output writes: Enabled")
+    # One write for the whole banner instead of a flush per line on interactive terminals
+    sys.stdout.write("\n".join(lines) + "\n\n")
     
     try:
-        fetch_and_save_historical_data(
-            symbol=args.symbol,
+        util.run(fetch_many_async(
+            args.symbol,
             timeframe=args.timeframe, 
             duration=args.duration,
             output_filename=args.output,
@@ -765,8 +2241,14 @@ def main():
             timezone_choice=args.timezone,
             start_date=args.start_date,
             end_date=args.end_date,
-            include_extended_hours=args.eth
-        )
+            include_extended_hours=args.eth,
+            output_format=args.output_format,
+            precision=args.precision,
+            cache_dir=args.cache_dir,
+            streaming_csv=args.streaming_csv,
+            chunksize=args.chunksize,
+            async_io=args.async_io
+        ))
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
         sys.exit(1)